@@ -1,27 +1,46 @@
 import sys
 import os
-import pickle
+import math
+import shelve
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import combinations, repeat
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QLabel, QComboBox, QPushButton, QSpinBox, QVBoxLayout, QWidget, QHBoxLayout, QTextEdit, QFrame, QSizePolicy, QSpacerItem
 )
-import re
-from collections import Counter
 import random
 # Import Deuces
 from deuces import Card, Evaluator, Deck
-from PyQt5.QtCore import Qt
+from deuces.lookup import LookupTable
+# NumPy and Numba are optional: without NumPy the prebuilt pre-flop table is
+# skipped, and without Numba the Monte Carlo functions run as plain Python loops
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import numba
+    from numba import njit, prange, get_num_threads
+    # Simulations run on a worker QThread; with the TBB threading layer that
+    # leaves the interpreter hanging on exit, so prefer OpenMP/workqueue
+    numba.config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+except ImportError:
+    njit = None
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QStandardItemModel, QStandardItem, QFont, QPalette, QColor
 
 # Valid card ranks and suits
 RANKS = '23456789TJQKA'
 SUITS = 'shdc'
 SUIT_SYMBOLS = {'s': '♠', 'h': '♥', 'd': '♦', 'c': '♣'}
-CARD_PATTERN = re.compile(r'^[2-9TJQKA][shdc]$', re.IGNORECASE)
 RANK_TO_VALUE = {r: i for i, r in enumerate(RANKS, 2)}
 
 # Generate all card options as (code, label), grouped by suit then rank
 SUIT_ORDER = 'cdhs'  # clubs, diamonds, hearts, spades
 CARD_OPTIONS = [(f'{r}{s}', f'{r}{SUIT_SYMBOLS[s]}') for s in SUIT_ORDER for r in RANKS]
+# Lowercase codes of the 52 valid cards, for parse_card
+VALID_CARDS = frozenset(code.lower() for code, _ in CARD_OPTIONS)
 
 # Add color for suits in HTML using <font color>
 # For dark mode: spades/clubs white, hearts/diamonds red
@@ -32,86 +51,48 @@ SUIT_HTML = {
     'c': '<font color="#fff">&#9831;</font>'   # white club
 }
 
-CACHE_FILE = 'preflop_cache.pkl'
+CACHE_FILE = 'preflop_cache.db'
+PREFLOP_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.npz')
+
+# Deuces ints for the full 52-card deck, built once and filtered per simulation
+FULL_DECK = Deck.GetFullDeck()
+# Deuces int for each card code, keyed by the lowercase code parse_card returns
+CARD_STR_TO_INT = {code.lower(): Card.new(code) for code, _ in CARD_OPTIONS}
+# Shared Deuces evaluator; its lookup tables are built once per process
+_EVAL = Evaluator()
+
+# Monte Carlo runs stop early once the 95% confidence interval of the win rate
+# and of every hand class frequency is within +/- TARGET_CI, checked every
+# CI_BATCH trials
+TARGET_CI = 0.005
+CI_BATCH = 2000
+CI_Z = 1.96
 
 def parse_card(card):
     card = card.strip().lower()
-    if CARD_PATTERN.match(card):
-        return card
-    return None
-
-
-def analyze_hand(cards):
-    if len(cards) < 5:
-        return "Not enough cards for hand analysis."
-    # Split into ranks and suits
-    ranks = [c[0].upper() for c in cards]
-    suits = [c[1].lower() for c in cards]
-    rank_counts = Counter(ranks)
-    suit_counts = Counter(suits)
-    unique_ranks = sorted(set(ranks), key=lambda r: RANK_TO_VALUE[r], reverse=True)
-
-    # Check for flush
-    flush_suit = None
-    for suit, count in suit_counts.items():
-        if count >= 5:
-            flush_suit = suit
-            break
-    flush_cards = [c for c in cards if c[1] == flush_suit] if flush_suit else []
-    flush_ranks = [c[0].upper() for c in flush_cards]
-
-    # Check for straight (and straight flush)
-    def get_straight(ranks_list):
-        values = sorted(set(RANK_TO_VALUE[r] for r in ranks_list), reverse=True)
-        # Handle wheel (A-2-3-4-5)
-        if set(['A', '2', '3', '4', '5']).issubset(set(ranks_list)):
-            values.append(1)
-        for i in range(len(values) - 4):
-            if values[i] - values[i+4] == 4:
-                return True, values[i]
-        return False, None
-
-    # Straight flush
-    if flush_suit and len(flush_ranks) >= 5:
-        is_sf, high_sf = get_straight(flush_ranks)
-        if is_sf:
-            if high_sf == 14:
-                return "Royal Flush"
-            return "Straight Flush"
-
-    # Four of a kind
-    if 4 in rank_counts.values():
-        return "Four of a Kind"
-    # Full house
-    if 3 in rank_counts.values() and 2 in rank_counts.values():
-        return "Full House"
-    # Flush
-    if flush_suit:
-        return "Flush"
-    # Straight
-    is_straight, high_straight = get_straight(ranks)
-    if is_straight:
-        return "Straight"
-    # Three of a kind
-    if 3 in rank_counts.values():
-        return "Three of a Kind"
-    # Two pair
-    if list(rank_counts.values()).count(2) >= 2:
-        return "Two Pair"
-    # Pair
-    if 2 in rank_counts.values():
-        return "Pair"
-    # High card
-    return f"High Card: {max(ranks, key=lambda r: RANK_TO_VALUE[r])}"
+    return card if card in VALID_CARDS else None
+
+
+def canonical_preflop_key(hand, players):
+    # Pre-flop odds only depend on the 169 hand classes (pair, suited, offsuit),
+    # so suit-isomorphic hands like AhKh and AdKd share one cache entry
+    high, low = sorted(hand, key=lambda c: RANK_TO_VALUE[c[0].upper()], reverse=True)
+    if high[0].upper() == low[0].upper():
+        kind = 'p'
+    elif high[1].lower() == low[1].lower():
+        kind = 's'
+    else:
+        kind = 'o'
+    return (high[0].upper(), low[0].upper(), kind, players)
 
 
 def to_deuces(card):
-    # Convert 'As' to 'As' for Deuces (same format, but uppercase)
-    return Card.new(card[0].upper() + card[1].lower())
+    # Convert 'as' or 'As' to its Deuces int via the precomputed table
+    return CARD_STR_TO_INT[card.lower()]
 
 
 def deuces_hand_strength(hand_cards, board_cards):
-    evaluator = Evaluator()
+    evaluator = _EVAL
     hand = [to_deuces(c) for c in hand_cards]
     board = [to_deuces(c) for c in board_cards]
     rank = evaluator.evaluate(board, hand)
@@ -119,39 +100,283 @@ def deuces_hand_strength(hand_cards, board_cards):
     return class_str
 
 
-def monte_carlo_odds(hand_cards, board_cards, num_players, num_trials=1000):
-    evaluator = Evaluator()
+if njit is not None:
+    # Flatten deuces' lookup dicts into arrays the JIT'd evaluator can index.
+    # Flushes and five distinct ranks are keyed by the 13-bit rank OR (as in
+    # Cactus Kev's flushes/unique5 tables); paired hands fall back to a binary
+    # search over the sorted prime products.
+    def _build_lookup_arrays(table):
+        flush_lut = np.zeros(1 << 13, dtype=np.int32)
+        unique5_lut = np.zeros(1 << 13, dtype=np.int32)
+        unique_primes = set()
+        for bits in range(1 << 13):
+            if bin(bits).count('1') != 5:
+                continue
+            prime = Card.prime_product_from_rankbits(bits)
+            flush_lut[bits] = table.flush_lookup[prime]
+            unique5_lut[bits] = table.unsuited_lookup[prime]
+            unique_primes.add(prime)
+        paired = sorted(p for p in table.unsuited_lookup if p not in unique_primes)
+        paired_primes = np.array(paired, dtype=np.int64)
+        paired_ranks = np.array([table.unsuited_lookup[p] for p in paired], dtype=np.int32)
+        rank_class = np.zeros(LookupTable.MAX_HIGH_CARD + 1, dtype=np.int32)
+        for max_rank in sorted(LookupTable.MAX_TO_RANK_CLASS, reverse=True):
+            rank_class[1:max_rank + 1] = LookupTable.MAX_TO_RANK_CLASS[max_rank]
+        return flush_lut, unique5_lut, paired_primes, paired_ranks, rank_class
+
+    FLUSH_LUT, UNIQUE5_LUT, PAIRED_PRIMES, PAIRED_RANKS, RANK_CLASS = _build_lookup_arrays(_EVAL.table)
+    WORST_RANK = LookupTable.MAX_HIGH_CARD
+
+    @njit(cache=True)
+    def _lookup(or_bits, and_bits, product):
+        # Same dispatch as deuces' Evaluator._five, given the OR, AND and prime
+        # product of the five cards
+        rank_bits = or_bits >> 16
+        if and_bits & 0xF000:
+            return FLUSH_LUT[rank_bits]
+        rank = UNIQUE5_LUT[rank_bits]
+        if rank:
+            return rank
+        return PAIRED_RANKS[np.searchsorted(PAIRED_PRIMES, product)]
+
+    @njit(cache=True)
+    def _eval_best_with(cards, n):
+        # Best rank over the 5-card subsets of cards[:n + 1] that contain
+        # cards[n]. The OR/AND/product of the outer cards is accumulated one
+        # card at a time instead of being rebuilt for every subset.
+        last = cards[n]
+        best = WORST_RANK
+        for a in range(n - 3):
+            or_a, and_a, prod_a = last | cards[a], last & cards[a], (last & 0xFF) * (cards[a] & 0xFF)
+            for b in range(a + 1, n - 2):
+                or_b, and_b, prod_b = or_a | cards[b], and_a & cards[b], prod_a * (cards[b] & 0xFF)
+                for c in range(b + 1, n - 1):
+                    or_c, and_c, prod_c = or_b | cards[c], and_b & cards[c], prod_b * (cards[c] & 0xFF)
+                    for d in range(c + 1, n):
+                        rank = _lookup(or_c | cards[d], and_c & cards[d], prod_c * (cards[d] & 0xFF))
+                        if rank < best:
+                            best = rank
+        return best
+
+    @njit(cache=True)
+    def _eval_best(cards, n):
+        # Best rank over every 5-card subset of cards[:n], like deuces' _six/_seven:
+        # the first five cards, then each further card's new subsets in turn
+        best = _eval_best_with(cards, 4)
+        for m in range(5, n):
+            rank = _eval_best_with(cards, m)
+            if rank < best:
+                best = rank
+        return best
+
+    # Cards inside the kernel are indices 0-51 into FULL_DECK (rank * 4 + suit);
+    # DECK_INTS maps them back to Deuces ints and a uint64 bitboard tracks the
+    # cards still live in the deck
+    DECK_INTS = np.array(FULL_DECK, dtype=np.int64)
+    CARD_INDEX = {c: i for i, c in enumerate(FULL_DECK)}
+    FULL_MASK = (1 << 52) - 1
+
+    @njit(cache=True)
+    def _xorshift(state):
+        # xorshift64: a few shifts per draw instead of NumPy's generator call
+        state ^= state << np.uint64(13)
+        state ^= state >> np.uint64(7)
+        state ^= state << np.uint64(17)
+        return state
+
+    @njit(cache=True)
+    def _draw(mask, state):
+        # Pick a random live card by rejection against the bitboard; returns
+        # the card index, the mask with that card removed and the RNG state
+        while True:
+            state = _xorshift(state)
+            idx = (state >> np.uint64(32)) % np.uint64(52)
+            bit = np.uint64(1) << idx
+            if mask & bit:
+                return idx, mask ^ bit, state
+
+    @njit(cache=True)
+    def _simulate_chunk_jit(hand, board, live_mask, num_opponents, num_trials, state):
+        n_board = len(board)
+        # Hero's 7 cards (hand + board) and one opponent's 7 cards
+        hero = np.empty(7, dtype=np.int64)
+        hero[0] = hand[0]
+        hero[1] = hand[1]
+        hero[2:2 + n_board] = board
+        opp = np.empty(7, dtype=np.int64)
+        # Hero hand class counts with 3, 4 and 5 community cards
+        counts = np.zeros((3, 10), dtype=np.int64)
+        wins = 0
+        ties = 0
+        for _ in range(num_trials):
+            mask = live_mask
+            for i in range(2 + n_board, 7):
+                idx, mask, state = _draw(mask, state)
+                hero[i] = DECK_INTS[idx]
+            # Later streets only add the subsets containing the newly dealt card,
+            # so flop, turn and river together cost one 7-card evaluation
+            n_first = max(n_board, 3)
+            hero_score = _eval_best(hero, n_first + 2)
+            counts[n_first - 3, RANK_CLASS[hero_score]] += 1
+            for n_comm in range(n_first + 1, 6):
+                rank = _eval_best_with(hero, n_comm + 1)
+                if rank < hero_score:
+                    hero_score = rank
+                counts[n_comm - 3, RANK_CLASS[hero_score]] += 1
+            # Win odds vs. random hands; once one opponent beats the hero the
+            # trial is a loss, so the remaining opponents are skipped
+            opp[2:] = hero[2:]
+            best_opp = WORST_RANK + 1
+            for k in range(num_opponents):
+                # Opponents' cards are only drawn if they get evaluated
+                idx, mask, state = _draw(mask, state)
+                opp[0] = DECK_INTS[idx]
+                idx, mask, state = _draw(mask, state)
+                opp[1] = DECK_INTS[idx]
+                score = _eval_best(opp, 7)
+                if score < best_opp:
+                    best_opp = score
+                    if best_opp < hero_score:
+                        break
+            if hero_score < best_opp:
+                wins += 1
+            elif hero_score == best_opp:
+                ties += 1
+        return wins, ties, counts
+
+    @njit(cache=True, parallel=True)
+    def _simulate_jit(hand, board, live_mask, num_opponents, num_trials, n_chunks, seed):
+        # Trials are independent: split them into one chunk per thread and sum.
+        # Each chunk gets its own xorshift state derived from the seed.
+        wins = np.zeros(n_chunks, dtype=np.int64)
+        ties = np.zeros(n_chunks, dtype=np.int64)
+        counts = np.zeros((n_chunks, 3, 10), dtype=np.int64)
+        for t in prange(n_chunks):
+            n = num_trials // n_chunks + (1 if t < num_trials % n_chunks else 0)
+            state = np.uint64(seed) ^ (np.uint64(t + 1) * np.uint64(0x9E3779B97F4A7C15))
+            if state == 0:
+                state = np.uint64(0x9E3779B97F4A7C15)
+            wins[t], ties[t], counts[t] = _simulate_chunk_jit(hand, board, live_mask, num_opponents, n, state)
+        return wins.sum(), ties.sum(), counts.sum(axis=0)
+
+
+def _simulate_chunk(hand, board, live, num_opponents, num_trials, seed):
+    # Pure-Python trial loop; module level so ProcessPoolExecutor can pickle it.
+    # live is the deck minus hand and board, built once by _simulate
+    evaluator = _EVAL
+    rng = random.Random(seed)
+    needed = 5 - len(board)
+    # Hero hand class counts with 3, 4 and 5 community cards
+    counts = [[0] * 10 for _ in range(3)]
     wins = 0
     ties = 0
-    losses = 0
-    hand = [to_deuces(c) for c in hand_cards]
-    board = [to_deuces(c) for c in board_cards]
-    known = set(hand + board)
     for _ in range(num_trials):
-        deck = Deck()
-        # Remove known cards from deck
-        for c in hand_cards + board_cards:
-            deck.cards.remove(to_deuces(c))
-        # Draw remaining community cards
-        needed = 5 - len(board)
-        sim_board = board + [deck.draw(1) for _ in range(needed)] if needed > 0 else board
-        # Draw opponents' hands
-        opp_hands = []
-        for _ in range(num_players - 1):
-            opp_hand = [deck.draw(1), deck.draw(1)]
-            opp_hands.append(opp_hand)
-        # Evaluate hero hand
-        hero_score = evaluator.evaluate(sim_board, hand)
-        opp_scores = [evaluator.evaluate(sim_board, opp) for opp in opp_hands]
-        if hero_score < min(opp_scores):
+        draws = rng.sample(live, needed + 2 * num_opponents)
+        # Remaining community cards, then opponents' hands in pairs
+        sim_board = board + draws[:needed]
+        # Later streets only add the 5-card subsets containing the newly dealt
+        # card, so flop, turn and river together cost one 7-card evaluation
+        n_first = max(len(board), 3)
+        hero_score = evaluator.evaluate(sim_board[:n_first], hand)
+        counts[n_first - 3][evaluator.get_rank_class(hero_score)] += 1
+        seven = hand + sim_board
+        for n in range(n_first + 2, 7):
+            new_best = min(evaluator._five(combo + (seven[n],)) for combo in combinations(seven[:n], 4))
+            hero_score = min(hero_score, new_best)
+            counts[n - 4][evaluator.get_rank_class(hero_score)] += 1
+        # Win odds vs. random hands; stop at the first opponent that beats the hero
+        best_opp = LookupTable.MAX_HIGH_CARD + 1
+        for i in range(needed, len(draws), 2):
+            best_opp = min(best_opp, evaluator.evaluate(sim_board, draws[i:i + 2]))
+            if best_opp < hero_score:
+                break
+        if hero_score < best_opp:
             wins += 1
-        elif hero_score == min(opp_scores):
+        elif hero_score == best_opp:
             ties += 1
-        else:
-            losses += 1
-    win_pct = 100 * wins / num_trials
-    tie_pct = 100 * ties / num_trials
-    return win_pct, tie_pct
+    return wins, ties, counts
+
+
+def _ci_half_width(successes, trials):
+    # 95% confidence interval half-width of a proportion. The +2/+4
+    # (Agresti-Coull) adjustment keeps a class that hasn't shown up yet from
+    # looking certain after a single batch.
+    n = trials + 4
+    p = (successes + 2) / n
+    return CI_Z * math.sqrt(p * (1 - p) / n)
+
+
+def _run_batches(run_batch, max_trials, target_ci, batch_size=CI_BATCH):
+    # Calls run_batch(n) until max_trials have run or, with target_ci, until
+    # the win rate and every hand class frequency are within +/- target_ci
+    # (checked every batch_size trials)
+    batch = batch_size if target_ci else max_trials
+    trials = 0
+    wins = 0
+    ties = 0
+    counts = [[0] * 10 for _ in range(3)]
+    while trials < max_trials:
+        n = min(batch, max_trials - trials)
+        batch_wins, batch_ties, batch_counts = run_batch(n)
+        trials += n
+        wins += int(batch_wins)
+        ties += int(batch_ties)
+        for street in range(3):
+            for i in range(10):
+                counts[street][i] += int(batch_counts[street][i])
+        if target_ci:
+            widest = max(_ci_half_width(c, trials) for row in counts if sum(row) for c in row[1:])
+            if max(widest, _ci_half_width(wins, trials)) < target_ci:
+                break
+    return trials, wins, ties, counts
+
+
+# Worker processes for the pure-Python path, started on first use and reused
+# for the rest of the session. Simulations run on a QThread and forking a
+# multi-threaded process can deadlock, so the workers are spawned instead
+_POOL = None
+
+
+def _get_pool(workers):
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    return _POOL
+
+
+def _simulate(hand, board, num_opponents, max_trials, target_ci=None):
+    # Returns (trials, wins, ties, counts) where counts[n - 3][hand_class]
+    # tallies the hero's hand class with n community cards dealt
+    if njit is not None:
+        live_mask = FULL_MASK
+        for c in hand + board:
+            live_mask &= ~(1 << CARD_INDEX[c])
+        hand_arr = np.array(hand, dtype=np.int64)
+        board_arr = np.array(board, dtype=np.int64)
+        return _run_batches(lambda n: _simulate_jit(hand_arr, board_arr, np.uint64(live_mask), num_opponents,
+                                                    n, get_num_threads(), np.uint64(random.getrandbits(64))),
+                            max_trials, target_ci)
+    # Remove known cards from the deck once for the whole run, not per batch
+    dead = set(hand + board)
+    live = [c for c in FULL_DECK if c not in dead]
+    workers = os.cpu_count() or 1
+    if workers <= 1 or max_trials < workers:
+        return _run_batches(lambda n: _simulate_chunk(hand, board, live, num_opponents, n, random.randrange(2 ** 32)),
+                            max_trials, target_ci)
+    executor = _get_pool(workers)
+
+    def run_batch(n):
+        sizes = [n // workers + (1 if i < n % workers else 0) for i in range(workers)]
+        seed = random.randrange(2 ** 32)
+        results = list(executor.map(_simulate_chunk, repeat(hand), repeat(board), repeat(live), repeat(num_opponents),
+                                    sizes, range(seed, seed + workers)))
+        wins = sum(r[0] for r in results)
+        ties = sum(r[1] for r in results)
+        counts = [[sum(r[2][street][i] for r in results) for i in range(10)] for street in range(3)]
+        return wins, ties, counts
+    # Give every worker a full CI_BATCH per round so each task's work
+    # outweighs its pickling and IPC overhead
+    return _run_batches(run_batch, max_trials, target_ci, CI_BATCH * workers)
 
 
 def card_label_html(card):
@@ -161,64 +386,55 @@ def card_label_html(card):
     return f'{r}{SUIT_HTML[s]}'
 
 
-def monte_carlo_hand_distribution(hand_cards, board_cards, num_trials=1000):
-    evaluator = Evaluator()
+def monte_carlo_combined(hand_cards, board_cards, num_players, max_trials=1000, target_ci=TARGET_CI):
+    # Win/tie odds and the river hand class counts from the same simulated deals
     hand = [to_deuces(c) for c in hand_cards]
     board = [to_deuces(c) for c in board_cards]
-    hand_type_counts = {i: 0 for i in range(1, 10)}  # 1-9 hand classes
-    for _ in range(num_trials):
-        deck = Deck()
-        for c in hand_cards + board_cards:
-            deck.cards.remove(to_deuces(c))
-        needed = 5 - len(board)
-        sim_board = board + [deck.draw(1) for _ in range(needed)] if needed > 0 else board
-        rank = evaluator.evaluate(sim_board, hand)
-        hand_class = evaluator.get_rank_class(rank)
-        hand_type_counts[hand_class] += 1
-    return hand_type_counts
-
-
-def monte_carlo_preflop_distributions(hand_cards, num_players, num_trials=75000):
-    evaluator = Evaluator()
+    trials, wins, ties, counts = _simulate(hand, board, num_players - 1, max_trials, target_ci)
+    hand_type_counts = {i: counts[2][i] for i in range(1, 10)}  # 1-9 hand classes
+    return 100 * wins / trials, 100 * ties / trials, hand_type_counts
+
+
+def monte_carlo_preflop_distributions(hand_cards, num_players, max_trials=75000, target_ci=TARGET_CI):
     hand = [to_deuces(c) for c in hand_cards]
-    flop_counts = {i: 0 for i in range(1, 10)}
-    turn_counts = {i: 0 for i in range(1, 10)}
-    river_counts = {i: 0 for i in range(1, 10)}
-    win = 0
-    tie = 0
-    for _ in range(num_trials):
-        deck = Deck()
-        for c in hand_cards:
-            deck.cards.remove(to_deuces(c))
-        # Flop
-        flop = [deck.draw(1) for _ in range(3)]
-        flop_rank = evaluator.evaluate(flop, hand)
-        flop_class = evaluator.get_rank_class(flop_rank)
-        flop_counts[flop_class] += 1
-        # Turn
-        turn = flop + [deck.draw(1)]
-        turn_rank = evaluator.evaluate(turn, hand)
-        turn_class = evaluator.get_rank_class(turn_rank)
-        turn_counts[turn_class] += 1
-        # River
-        river = turn + [deck.draw(1)]
-        river_rank = evaluator.evaluate(river, hand)
-        river_class = evaluator.get_rank_class(river_rank)
-        river_counts[river_class] += 1
-        # Win odds vs. random hands
-        opp_hands = []
-        for _ in range(num_players - 1):
-            opp_hand = [deck.draw(1), deck.draw(1)]
-            opp_hands.append(opp_hand)
-        hero_score = river_rank
-        opp_scores = [evaluator.evaluate(river, opp) for opp in opp_hands]
-        if hero_score < min(opp_scores):
-            win += 1
-        elif hero_score == min(opp_scores):
-            tie += 1
+    _, win, tie, counts = _simulate(hand, [], num_players - 1, max_trials, target_ci)
+    flop_counts, turn_counts, river_counts = ({i: row[i] for i in range(1, 10)} for row in counts)
     return flop_counts, turn_counts, river_counts, win, tie
 
 
+def preflop_percentages(flop_counts, turn_counts, river_counts, win, tie):
+    # Convert pre-flop simulation counts to (win %, tie %, flop %, turn %, river %),
+    # where each street is a dict of hand class -> percentage
+    total = sum(river_counts.values())
+    street_pcts = tuple({i: 100 * counts.get(i, 0) / total if total else 0 for i in range(1, 10)}
+                        for counts in (flop_counts, turn_counts, river_counts))
+    return (100 * win / total, 100 * tie / total) + street_pcts
+
+
+def load_preflop_table():
+    # Pre-flop odds for every hand class and player count, built offline by
+    # tools/build_preflop_table.py. Maps canonical_preflop_key() to the same
+    # tuple preflop_percentages() returns.
+    if np is None or not os.path.exists(PREFLOP_TABLE_FILE):
+        return {}
+    try:
+        with np.load(PREFLOP_TABLE_FILE) as data:
+            # odds[class, players - 2] = [win, tie, flop x9, turn x9, river x9] in 0.01% units
+            classes, players, odds = data['classes'], data['players'], data['odds'] / 100
+    except Exception:
+        return {}
+    table = {}
+    for label, rows in zip(classes.tolist(), odds.tolist()):
+        kind = label[2] if len(label) == 3 else 'p'
+        for num_players, row in zip(players.tolist(), rows):
+            street_pcts = tuple(dict(zip(range(1, 10), row[k:k + 9])) for k in (2, 11, 20))
+            table[(label[0], label[1], kind, num_players)] = (row[0], row[1]) + street_pcts
+    return table
+
+
+PREFLOP_TABLE = load_preflop_table()
+
+
 HAND_CLASS_NAMES = [
     "High Card", "Pair", "Two Pair", "Three of a Kind", "Straight", "Flush", "Full House", "Four of a Kind", "Straight Flush"
 ]
@@ -235,6 +451,25 @@ HAND_TYPE_EXAMPLES = {
     8: lambda: card_label_html('As') + card_label_html('Ah') + card_label_html('Ad') + card_label_html('Ac'),  # Four of a Kind
     9: lambda: ''.join([card_label_html(r + 's') for r in ['A', 'K', 'Q', 'J', 'T']]),  # Straight Flush
 }
+# Rendered once at import instead of on every pre-flop click
+HAND_TYPE_EXAMPLES_HTML = {i: fn() for i, fn in HAND_TYPE_EXAMPLES.items()}
+
+class MCWorker(QObject):
+    # Runs one simulation call on a QThread and emits its return value
+    resultReady = pyqtSignal(object)
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+
+    @pyqtSlot()
+    def run(self):
+        self.result = self.fn(*self.args, **self.kwargs)
+        self.resultReady.emit(self.result)
+
 
 class PokerOddsCalculator(QMainWindow):
     def __init__(self):
@@ -389,6 +624,11 @@ class PokerOddsCalculator(QMainWindow):
         # Load pre-flop cache from disk if available
         self.preflop_cache = self.load_preflop_cache()
 
+        # Background simulation state, see _run_in_background
+        self._worker_thread = None
+        self._worker = None
+        self._on_worker_result = None
+
     def _populate_card_dropdown(self, cb):
         cb.clear()
         cb.setEditable(False)
@@ -402,20 +642,32 @@ class PokerOddsCalculator(QMainWindow):
         return code if code else ''
 
     def load_preflop_cache(self):
-        if os.path.exists(CACHE_FILE):
-            try:
-                with open(CACHE_FILE, 'rb') as f:
-                    return pickle.load(f)
-            except Exception:
-                return {}
-        return {}
-
-    def save_preflop_cache(self):
+        # Disk-backed dict keyed by repr(canonical_preflop_key()); each new
+        # entry is written on its own instead of rewriting the whole cache
         try:
-            with open(CACHE_FILE, 'wb') as f:
-                pickle.dump(self.preflop_cache, f)
+            return shelve.open(CACHE_FILE)
         except Exception:
-            pass
+            return {}
+
+    def closeEvent(self, event):
+        # Let a running simulation finish before the cache is closed. This can
+        # take a few seconds for a 500k-trial pre-flop run, during which the
+        # window can't respond, so say so and show a busy cursor
+        if self._worker_thread is not None and self._worker_thread.isRunning():
+            self._worker.resultReady.disconnect(self._worker_done)
+            self.results_area.setText('Finishing the current simulation before closing…')
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            QApplication.processEvents()
+            self._worker_thread.quit()
+            self._worker_thread.wait()
+            QApplication.restoreOverrideCursor()
+        # Hand over a result that hasn't been delivered yet while the cache is
+        # still open, so a finished pre-flop run is still saved
+        if self._on_worker_result is not None and self._worker.result is not None:
+            self._worker_done(self._worker.result)
+        if isinstance(self.preflop_cache, shelve.Shelf):
+            self.preflop_cache.close()
+        super().closeEvent(event)
 
     def calculate_odds(self):
         # Gather all card inputs from dropdowns
@@ -453,22 +705,88 @@ class PokerOddsCalculator(QMainWindow):
         hand = [c for c in hand if c]
         board = [c for c in community if c]
         all_cards = hand + board
-        hand_analysis = analyze_hand(all_cards)
 
-        # Deuces hand strength
-        if len(hand) == 2 and len(all_cards) >= 5:
-            deuces_strength = deuces_hand_strength(hand, board)
+        # Best hand, classified by Deuces
+        if len(all_cards) >= 5:
+            hand_analysis = deuces_hand_strength(hand, board)
         else:
-            deuces_strength = "(Not enough cards for Deuces evaluation)"
+            hand_analysis = "Not enough cards for hand analysis."
+
+        # Pre-flop only: show hand type odds for flop, turn, river
+        if len(hand) == 2 and not board:
+            key = canonical_preflop_key(hand, players)
+            key_str = repr(key)
+            if key in PREFLOP_TABLE:
+                self._display_preflop(hand, players, *PREFLOP_TABLE[key])
+            elif key_str in self.preflop_cache:
+                self._display_preflop(hand, players, *preflop_percentages(*self.preflop_cache[key_str]))
+            else:
+                self._run_in_background(partial(self._finish_preflop, hand, players, key_str),
+                                        monte_carlo_preflop_distributions, hand, players, max_trials=500000)
+            return
 
         # Monte Carlo odds
-        odds_str = ""
-        hand_dist_str = ""
         if len(hand) == 2 and len(all_cards) >= 5:
-            win_pct, tie_pct = monte_carlo_odds(hand, board, players, num_trials=75000)
+            self._run_in_background(partial(self._display_results, hand, board, players, hand_analysis),
+                                    monte_carlo_combined, hand, board, players, max_trials=75000)
+        else:
+            self._display_results(hand, board, players, hand_analysis, None)
+
+    def _run_in_background(self, on_result, fn, *args, **kwargs):
+        # Run fn on a worker thread so the window stays responsive; on_result
+        # is called on the UI thread with its return value
+        self.results_area.setText('Calculating…')
+        self.calc_button.setEnabled(False)
+        self._on_worker_result = on_result
+        self._worker_thread = QThread()
+        self._worker = MCWorker(fn, *args, **kwargs)
+        self._worker.moveToThread(self._worker_thread)
+        self._worker_thread.started.connect(self._worker.run)
+        self._worker.resultReady.connect(self._worker_done)
+        self._worker_thread.start()
+
+    def _worker_done(self, result):
+        # Already handled by closeEvent if the window closed while it was queued
+        if self._on_worker_result is None:
+            return
+        self._worker_thread.quit()
+        self._worker_thread.wait()
+        self.calc_button.setEnabled(True)
+        on_result, self._on_worker_result = self._on_worker_result, None
+        on_result(result)
+
+    def _finish_preflop(self, hand, players, key_str, counts):
+        self.preflop_cache[key_str] = counts
+        self._display_preflop(hand, players, *preflop_percentages(*counts))
+
+    def _display_preflop(self, hand, players, win_pct, tie_pct, flop_pcts, turn_pcts, river_pcts):
+        hand_dist_str = "<b>Possible Hands by Flop, Turn, River:</b><br>"
+        hand_dist_str += "<table style='width:100%;text-align:left;font-size:12pt; border-collapse:collapse;'>"
+        hand_dist_str += "<tr><th style='padding-right:12px;'>Hand (Example)</th><th>Flop</th><th>Turn</th><th>River</th></tr>"
+        for i in range(1, 10):
+            name = Evaluator.class_to_string(None, i)
+            example = HAND_TYPE_EXAMPLES_HTML[i]
+            hand_dist_str += f"<tr><td style='padding-right:12px;'>{example} <b>({name})</b></td><td>{flop_pcts[i]:.1f}%</td><td>{turn_pcts[i]:.1f}%</td><td>{river_pcts[i]:.1f}%</td></tr>"
+        hand_dist_str += "</table>"
+        hand_dist_str += "<div style='font-size:10pt; color:#aaa; margin-top:8px;'>Legend: <b>A</b>=Ace, <b>K</b>=King, <b>Q</b>=Queen, <b>J</b>=Jack, <b>T</b>=Ten, <span style='color:red;'>♥♦</span>=Hearts/Diamonds, <span style='color:#fff;'>♠♣</span>=Spades/Clubs</div>"
+        odds_str = f"Win: {win_pct:.1f}%, Tie: {tie_pct:.1f}% (est. by river)"
+        hand_html = ' '.join(card_label_html(c) for c in hand)
+        result = (
+            f"<b>Your hand:</b> {hand_html}<br>"
+            f"<b>Players:</b> {players}<br>"
+            f"<b>Pre-Flop Analysis</b><br>"
+            f"<b>Odds to win:</b> {odds_str}<br>"
+            f"{hand_dist_str}"
+        )
+        self.results_area.setHtml(result)
+        self.results_area.moveCursor(0)
+
+    def _display_results(self, hand, board, players, hand_analysis, odds):
+        # odds is monte_carlo_combined()'s (win %, tie %, hand type counts), or None
+        # when there aren't enough cards to simulate
+        if odds:
+            win_pct, tie_pct, hand_type_counts = odds
             odds_str = f"Win: {win_pct:.1f}%, Tie: {tie_pct:.1f}% (est.)"
-            # Hand distribution
-            hand_type_counts = monte_carlo_hand_distribution(hand, board, num_trials=75000)
             total = sum(hand_type_counts.values())
             hand_dist_str = "<b>Possible Hands:</b><br>"
             for i in range(1, 10):
@@ -479,45 +797,6 @@ class PokerOddsCalculator(QMainWindow):
             odds_str = "(Not enough cards for odds simulation)"
             hand_dist_str = ""
 
-        # Pre-flop only: show hand type odds for flop, turn, river
-        if len(hand) == 2 and all(c == '' for c in board):
-            key = tuple(sorted(hand)) + (players,)
-            if key in self.preflop_cache:
-                flop_counts, turn_counts, river_counts, win, tie = self.preflop_cache[key]
-            else:
-                flop_counts, turn_counts, river_counts, win, tie = monte_carlo_preflop_distributions(hand, players, num_trials=500000)
-                self.preflop_cache[key] = (flop_counts, turn_counts, river_counts, win, tie)
-                self.save_preflop_cache()
-            flop_total = sum(flop_counts.values())
-            turn_total = sum(turn_counts.values())
-            river_total = sum(river_counts.values())
-            win_pct = 100 * win / 500000
-            tie_pct = 100 * tie / 500000
-            hand_dist_str = "<b>Possible Hands by Flop, Turn, River:</b><br>"
-            hand_dist_str += "<table style='width:100%;text-align:left;font-size:12pt; border-collapse:collapse;'>"
-            hand_dist_str += "<tr><th style='padding-right:12px;'>Hand (Example)</th><th>Flop</th><th>Turn</th><th>River</th></tr>"
-            for i in range(1, 10):
-                name = Evaluator.class_to_string(None, i)
-                example = HAND_TYPE_EXAMPLES[i]()
-                flop_pct = 100 * flop_counts.get(i, 0) / flop_total if flop_total else 0
-                turn_pct = 100 * turn_counts.get(i, 0) / turn_total if turn_total else 0
-                river_pct = 100 * river_counts.get(i, 0) / river_total if river_total else 0
-                hand_dist_str += f"<tr><td style='padding-right:12px;'>{example} <b>({name})</b></td><td>{flop_pct:.1f}%</td><td>{turn_pct:.1f}%</td><td>{river_pct:.1f}%</td></tr>"
-            hand_dist_str += "</table>"
-            hand_dist_str += "<div style='font-size:10pt; color:#aaa; margin-top:8px;'>Legend: <b>A</b>=Ace, <b>K</b>=King, <b>Q</b>=Queen, <b>J</b>=Jack, <b>T</b>=Ten, <span style='color:red;'>♥♦</span>=Hearts/Diamonds, <span style='color:#fff;'>♠♣</span>=Spades/Clubs</div>"
-            odds_str = f"Win: {win_pct:.1f}%, Tie: {tie_pct:.1f}% (est. by river)"
-            hand_html = ' '.join(card_label_html(c) for c in hand)
-            result = (
-                f"<b>Your hand:</b> {hand_html}<br>"
-                f"<b>Players:</b> {players}<br>"
-                f"<b>Pre-Flop Analysis</b><br>"
-                f"<b>Odds to win:</b> {odds_str}<br>"
-                f"{hand_dist_str}"
-            )
-            self.results_area.setHtml(result)
-            self.results_area.moveCursor(0)
-            return
-
         # Use HTML for colored cards
         hand_html = ' '.join(card_label_html(c) for c in hand)
         board_html = ' '.join(card_label_html(c) for c in board)
@@ -526,7 +805,6 @@ class PokerOddsCalculator(QMainWindow):
             f"<b>Community:</b> {board_html}<br>"
             f"<b>Players:</b> {players}<br>"
             f"<b>Best hand:</b> {hand_analysis}<br>"
-            f"<b>Deuces hand strength:</b> {deuces_strength}<br>"
             f"<b>Odds to win:</b> {odds_str}<br>"
             f"{hand_dist_str}"
         )
@@ -0,0 +1,71 @@
+"""Precompute pre-flop odds for every hand class and player count.
+
+Runs the pre-flop Monte Carlo simulation once for each of the 169 hand
+classes against 1-9 random opponents and writes the results to
+preflop_equity.npz, which PokerOddsCalculator.py serves pre-flop lookups from.
+
+Usage (from the repository root):
+    python tools/build_preflop_table.py [--trials N]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PokerOddsCalculator import (  # noqa: E402
+    PREFLOP_TABLE_FILE, RANKS, monte_carlo_preflop_distributions, preflop_percentages
+)
+
+PLAYER_COUNTS = range(2, 11)
+
+
+def hand_class_labels():
+    # 'AA', 'AKs', 'AKo', ... in descending rank order: 13 pairs + 78 suited + 78 offsuit
+    ranks = RANKS[::-1]
+    labels = []
+    for i, high in enumerate(ranks):
+        labels.append(high + high)
+        for low in ranks[i + 1:]:
+            labels.extend([high + low + 's', high + low + 'o'])
+    return labels
+
+
+def example_hand(label):
+    # Any hand in the class will do; suits only matter for suited vs offsuit
+    high, low = label[0], label[1]
+    if high == low:
+        return [high + 's', low + 'h']
+    return [high + 's', low + ('s' if label[2] == 's' else 'h')]
+
+
+def build_table(num_trials):
+    labels = hand_class_labels()
+    # [win, tie, flop x9, turn x9, river x9] per class and player count, in 0.01% units
+    odds = np.zeros((len(labels), len(PLAYER_COUNTS), 29), dtype=np.uint16)
+    for i, label in enumerate(labels):
+        for j, players in enumerate(PLAYER_COUNTS):
+            # Run every trial rather than stopping at the app's confidence target
+            counts = monte_carlo_preflop_distributions(example_hand(label), players,
+                                                       max_trials=num_trials, target_ci=None)
+            win_pct, tie_pct, flop_pcts, turn_pcts, river_pcts = preflop_percentages(*counts)
+            row = [win_pct, tie_pct] + [pcts[k] for pcts in (flop_pcts, turn_pcts, river_pcts) for k in range(1, 10)]
+            odds[i, j] = np.round(np.array(row) * 100)
+        print(f'{label:>4} ({i + 1}/{len(labels)})', flush=True)
+    return np.array(labels), np.array(PLAYER_COUNTS), odds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=100000, help='simulations per hand class and player count')
+    parser.add_argument('--output', default=PREFLOP_TABLE_FILE, help='where to write the .npz table')
+    args = parser.parse_args()
+    classes, players, odds = build_table(args.trials)
+    np.savez_compressed(args.output, classes=classes, players=players, odds=odds)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()